@@ -1,24 +1,67 @@
 import asyncio
 import datetime
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict
 
 import cohere
 from langchain_community.chat_models import ChatCohere
 from langchain_community.llms import Cohere
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 import pyjokes
 import pywhatkit
-import wikipedia
+import requests
 
 from dotenv import load_dotenv
 
+from OfflineWiki import OfflineWikiIndex
+
 load_dotenv()  # Load environment variables from .env file
 CKey = os.environ["COHERE_API_KEY"]
 
 #with open('Coherekey', 'r') as file:
 #    CKey = file.read().strip()
 
+# Blocking tool calls get their own small thread pool so hung ones can't use up
+# the default executor the LLM and embedding calls run on
+TOOL_WORKERS = 4
+TOOL_HTTP_TIMEOUT = 10.0
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+WIKI_API_URL = "https://en.wikipedia.org/w/api.php"
+WIKI_USER_AGENT = "LearningAgents (https://github.com/Arcturus04-Zik/LearningAgents)"
+
+async def run_tool_call(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_tool_executor, functools.partial(func, *args, **kwargs))
+
+def wiki_summary(query, sentences=3):
+    # Best matching article's intro in one MediaWiki API call. The wikipedia
+    # package can't be given a timeout, so hung lookups would never end.
+    response = requests.get(
+        WIKI_API_URL,
+        params={
+            'action': 'query',
+            'format': 'json',
+            'generator': 'search',
+            'gsrsearch': query,
+            'gsrlimit': 1,
+            'prop': 'extracts',
+            'exintro': 1,
+            'explaintext': 1,
+            'exsentences': sentences,
+            'redirects': 1,
+        },
+        headers={'User-Agent': WIKI_USER_AGENT},
+        timeout=TOOL_HTTP_TIMEOUT
+    )
+    response.raise_for_status()
+    pages = response.json().get('query', {}).get('pages', {})
+    if not pages:
+        raise LookupError(f"No article found for {query}")
+    return next(iter(pages.values())).get('extract', '')
+
 class Tool(BaseModel):
     name: str
     description: str
@@ -37,7 +80,29 @@ class WikiSearchTool(Tool):
     
     async def execute(self, query: str) -> str:
         try:
-            return wikipedia.summary(query, sentences=3)
+            return await run_tool_call(wiki_summary, query, sentences=3)
+        except Exception as e:
+            return f"Error searching Wikipedia: {str(e)}"
+
+class OfflineWikiSearchTool(Tool):
+    # Same tool as WikiSearchTool but answered from a local index built by OfflineWiki.py
+    _index: Any = PrivateAttr()
+
+    def __init__(self, index_path: str):
+        super().__init__(
+            name="wiki_search",
+            description="Search Wikipedia for information about a topic",
+            parameters={"query": "The topic to search for"}
+        )
+        self._index = OfflineWikiIndex(index_path)
+
+    async def execute(self, query: str) -> str:
+        try:
+            result = self._index.summary(query, sentences=3)
+            if result is None:
+                return f"Error searching Wikipedia: No article found for {query}"
+            title, summary = result
+            return f"{title}: {summary}"
         except Exception as e:
             return f"Error searching Wikipedia: {str(e)}"
 
@@ -63,9 +128,9 @@ class GoogleSearchTool(Tool):
     async def execute(self, query: str) -> str:
         try:
             # Open browser for search
-            pywhatkit.search(query)
-            # Get search information
-            search_info = pywhatkit.info(query, lines=2)
+            await run_tool_call(pywhatkit.search, query)
+            # Get search information (the summary pywhatkit.info would fetch, with a timeout)
+            search_info = await run_tool_call(wiki_summary, query, sentences=2)
             return f"Searched Google for: {query}\nQuick summary: {search_info}"
         except Exception as e:
             return f"Error performing Google search: {str(e)}"
@@ -82,9 +147,11 @@ class TimeTool(Tool):
         return datetime.datetime.now().strftime("%I:%M %p")
 
 class ToolManager:
-    def __init__(self):
+    def __init__(self, wiki_index=None):
+        # Use a local Wikipedia index instead of the live API when one is configured
+        wiki_index = wiki_index or os.environ.get("WIKI_INDEX_PATH")
         self.tools = {
-            "wiki": WikiSearchTool(),
+            "wiki": OfflineWikiSearchTool(wiki_index) if wiki_index else WikiSearchTool(),
             "joke": JokeTool(),
             "google": GoogleSearchTool(),
             "time": TimeTool()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+# Network timeout for the Cohere clients. wait_for only stops waiting on a
+# call, so this is what lets an abandoned call's thread actually finish.
+CLIENT_TIMEOUT = 30.0
+
+# Per-turn time budget for the agent pipeline. Each step asks the deadline how
+# long it may take; steps that do not fit are skipped or cut short, and every
+# such decision is recorded so the budgets can be tuned.
+
+
+class TurnDeadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+        self.decisions = []
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def record(self, step, action, reason):
+        self.decisions.append({
+            'step': step,
+            'action': action,
+            'reason': reason,
+            'elapsed': round(self.elapsed(), 3),
+            'remaining': round(self.remaining(), 3),
+        })
+
+    def allowance(self, limit, reserve=0.0):
+        # Time a step may use: its own limit, but never eating into the reserve
+        # kept for the steps after it
+        return min(limit, self.remaining() - reserve)
+
+    async def run(self, step, awaitable, limit, reserve=0.0, minimum=0.1):
+        """Await `awaitable` within the step's allowance.
+
+        Returns (True, result), or (False, None) when the step was skipped
+        because there was not enough time left or it ran out of time.
+        """
+        timeout = self.allowance(limit, reserve)
+        if timeout < minimum:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.record(step, 'skipped', f"only {max(timeout, 0.0):.2f}s left for this step")
+            return False, None
+        try:
+            return True, await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            self.record(step, 'timed out', f"gave up after {timeout:.2f}s")
+            return False, None
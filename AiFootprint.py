@@ -0,0 +1,177 @@
+import sys
+import time
+import tracemalloc
+import warnings
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Memory footprint introspection for SimpleAgent / AiMemoryManager.
+# Sizes are shallow-plus-contents estimates of the Python objects the agent
+# holds on to, good enough to see what is growing and how fast.
+
+
+def _memory_of(agent):
+    return getattr(agent, 'memory_service', agent)
+
+
+_FLOAT_BYTES = sys.getsizeof(0.0)
+
+
+def _vector_bytes(vector):
+    if isinstance(vector, np.ndarray):
+        return sys.getsizeof(vector) + (0 if vector.base is None else vector.nbytes)
+    # Every Python float is the same size, no need to ask each one
+    return sys.getsizeof(vector) + len(vector) * _FLOAT_BYTES
+
+
+def _text_bytes(texts):
+    return sys.getsizeof(texts) + sum(sys.getsizeof(text) for text in texts)
+
+
+def measure_memory(agent):
+    memory = _memory_of(agent)
+
+    vectors = sum(_vector_bytes(m['vector']) for m in memory.vector_memory)
+    texts = _text_bytes([m['text'] for m in memory.vector_memory])
+    # the list itself plus one dict per stored memory
+    texts += sum(sys.getsizeof(m) for m in memory.vector_memory)
+    summaries = _text_bytes(memory.SummarizedMemory)
+    recent = sys.getsizeof(memory.recent_interactions) + sum(
+        sys.getsizeof(i) + _text_bytes([str(v) for v in i.values()])
+        for i in memory.recent_interactions
+    )
+
+    # Sharded stores keep a second, packed copy of the vectors in shared memory
+    caches = sum(
+        shard.shm.size for shard in getattr(memory, '_shards', []) if shard.shm is not None
+    )
+    caches += sum(shm.size for shm in getattr(memory, '_retired', []))
+
+    return {
+        'memories': len(memory.vector_memory),
+        'vectors': vectors,
+        'texts': texts,
+        'summaries': summaries,
+        'recent': recent,
+        'caches': caches,
+        'total': vectors + texts + summaries + recent + caches,
+    }
+
+
+def _format_bytes(size):
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class FootprintMonitor:
+    def __init__(self, agent, soft_limit=None, on_limit=None, compact=True, history=100, interval=60.0):
+        self.agent = agent
+        self.soft_limit = soft_limit  # bytes
+        self.on_limit = on_limit      # called as on_limit(agent, report)
+        self.compact = compact
+        self.interval = interval      # seconds between samples taken by maybe_sample
+        self.samples = deque(maxlen=history)
+
+    def maybe_sample(self):
+        # Cheap to call every turn: only measures once per interval
+        if self.samples and time.monotonic() - self.samples[-1][0] < self.interval:
+            return None
+        return self.sample()
+
+    def sample(self):
+        report = measure_memory(self.agent)
+        self.samples.append((time.monotonic(), report['total']))
+
+        if self.soft_limit is not None and report['total'] > self.soft_limit:
+            if self.compact:
+                _memory_of(self.agent).compact_memory()
+                report = measure_memory(self.agent)
+                self.samples[-1] = (self.samples[-1][0], report['total'])
+            if report['total'] > self.soft_limit:
+                if self.on_limit is not None:
+                    self.on_limit(self.agent, report)
+                else:
+                    warnings.warn(
+                        f"Agent memory {_format_bytes(report['total'])} is over the "
+                        f"soft limit of {_format_bytes(self.soft_limit)}",
+                        RuntimeWarning
+                    )
+        return report
+
+    def growth_rate(self):
+        # bytes per second between the oldest and newest samples kept
+        if len(self.samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+    def format_report(self):
+        report = self.sample()
+        lines = [f"Memory footprint ({report['memories']} stored memories):"]
+        for key in ['vectors', 'texts', 'summaries', 'recent', 'caches', 'total']:
+            lines.append(f"  {key:<10} {_format_bytes(report[key])}")
+        lines.append(f"  growth     {_format_bytes(self.growth_rate())}/s")
+        if self.soft_limit is not None:
+            lines.append(f"  limit      {_format_bytes(self.soft_limit)}")
+        return "\n".join(lines)
+
+
+class AllocationProfile:
+    def __init__(self):
+        self.calls = {}  # method name -> number of calls profiled
+        self.stats = {}  # method name -> {traceback line: bytes allocated}
+
+    def record(self, name, before, after):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        lines = self.stats.setdefault(name, {})
+        for diff in after.compare_to(before, 'lineno'):
+            if diff.size_diff > 0:
+                key = str(diff.traceback)
+                lines[key] = lines.get(key, 0) + diff.size_diff
+
+    def format_report(self, top=10):
+        lines = []
+        for name, allocations in self.stats.items():
+            lines.append(f"{name} ({self.calls[name]} calls):")
+            ranked = sorted(allocations.items(), key=lambda item: item[1], reverse=True)
+            for where, size in ranked[:top]:
+                lines.append(f"  {_format_bytes(size):>10}  {where}")
+        return "\n".join(lines) or "No allocations recorded"
+
+
+@contextmanager
+def profile_allocations(agent, frames=1):
+    # Wrap the memory service's store_memory/ManageMemory paths and record what
+    # each call allocated while the block is active
+    memory = _memory_of(agent)
+    profile = AllocationProfile()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+
+    def wrap(name):
+        method = getattr(memory, name)
+
+        async def profiled(*args, **kwargs):
+            before = tracemalloc.take_snapshot()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                profile.record(name, before, tracemalloc.take_snapshot())
+        setattr(memory, name, profiled)
+
+    names = ['store_memory', 'ManageMemory']
+    for name in names:
+        wrap(name)
+    try:
+        yield profile
+    finally:
+        for name in names:
+            delattr(memory, name)
+        if started:
+            tracemalloc.stop()
@@ -3,6 +3,7 @@ import os
 from typing import List
 
 import cohere
+import numpy as np
 from langchain_community.chat_models import ChatCohere
 from langchain_community.llms import Cohere
 from pydantic import BaseModel
@@ -10,6 +11,8 @@ from sklearn.metrics.pairwise import cosine_similarity
 
 from dotenv import load_dotenv
 
+from AiDeadline import CLIENT_TIMEOUT
+
 load_dotenv()  # Load environment variables from .env file
 CKey = os.environ["COHERE_API_KEY"]
 
@@ -18,7 +21,7 @@ CKey = os.environ["COHERE_API_KEY"]
     
 class AiMemoryManager:
     def __init__(self, api_key, role, goal):
-        self.llm = cohere.Client(api_key)
+        self.llm = cohere.Client(api_key, timeout=CLIENT_TIMEOUT)
         self.role = role
         self.goal = goal
         self.vector_memory = []
@@ -26,7 +29,9 @@ class AiMemoryManager:
         self.recent_interactions = []  # Store last 3 interactions
 
     async def embed_text(self, text):
-        response = self.llm.embed(
+        # Run the blocking client call off the event loop so callers can time out
+        response = await asyncio.to_thread(
+            self.llm.embed,
             texts=[text],
             model='embed-english-v3.0',
             input_type='search_document'  # Added input_type parameter
@@ -40,6 +45,17 @@ class AiMemoryManager:
             'vector': embedding
         })
 
+    def compact_memory(self):
+        # Embeddings arrive as lists of Python floats (~32 bytes per value).
+        # Pack any still in that form into one float32 block (4 bytes per value).
+        loose = [memory for memory in self.vector_memory if isinstance(memory['vector'], list)]
+        if not loose:
+            return 0
+        block = np.asarray([memory['vector'] for memory in loose], dtype=np.float32)
+        for memory, vector in zip(loose, block):
+            memory['vector'] = vector
+        return len(loose)
+
     async def retrieve_relevant_context(self, query, k=3):
         if not self.vector_memory:
             return []  # Return empty list if no memories exist
@@ -96,7 +112,8 @@ class AiMemoryManager:
                 {combined_context}
                 Create a brief summary that captures key information from all interactions:"""     
                 
-                summary_for_memory = self.llm.generate(
+                summary_for_memory = await asyncio.to_thread(
+                    self.llm.generate,
                     model='command',
                     prompt=prompt,
                     max_tokens=250,
@@ -0,0 +1,186 @@
+import asyncio
+import heapq
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from AiMemory import AiMemoryManager
+
+# Drop-in AiMemoryManager for very large stores. The vectors are partitioned
+# into shards that live in shared memory; a process pool scores each shard
+# in parallel and only the small per-shard top-k lists come back to be merged.
+# Queries only send the query vector to the workers, never the store.
+
+# By the first query the agent has already started threads (asyncio.to_thread),
+# and forking a threaded process can deadlock, so never use plain fork
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_attached = {}  # worker side: shard index -> (shared memory name, SharedMemory)
+
+
+def _shard_top_k(shard, name, count, dim, query, k):
+    cached = _attached.get(shard)
+    if cached is None or cached[0] != name:
+        if cached is not None:
+            cached[1].close()
+        cached = (name, SharedMemory(name=name))
+        _attached[shard] = cached
+
+    vectors = np.ndarray((count, dim), dtype=np.float32, buffer=cached[1].buf)
+    scores = vectors @ query
+    if count > k:
+        rows = np.argpartition(scores, -k)[-k:]
+    else:
+        rows = np.arange(count)
+    return [(float(scores[row]), int(row)) for row in rows]
+
+
+def _cleanup(executor, segments):
+    # Shared by close() and the weakref.finalize fallback, so it must not
+    # hold a reference to the manager itself
+    executor.shutdown(wait=False, cancel_futures=True)
+    for shm in list(segments):
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    segments.clear()
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Shard:
+    def __init__(self):
+        self.shm = None
+        self.capacity = 0
+        self.count = 0
+        self.ids = []  # position in vector_memory for each row
+
+    def rows(self, dim):
+        return np.ndarray((self.capacity, dim), dtype=np.float32, buffer=self.shm.buf)
+
+
+class ShardedMemoryManager(AiMemoryManager):
+    def __init__(self, api_key, role, goal, shards=None, workers=None, capacity=1024):
+        super().__init__(api_key, role, goal)
+        self.shard_count = shards or os.cpu_count() or 1
+        self.initial_capacity = capacity
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers or self.shard_count,
+            mp_context=multiprocessing.get_context(_START_METHOD)
+        )
+        self._shards = [_Shard() for _ in range(self.shard_count)]
+        self._dim = None
+        self._indexed = 0
+        self._indexed_list = self.vector_memory
+        self._retired = []  # grown-out-of blocks still visible to in-flight queries
+        self._inflight = 0
+        self._segments = set()  # every SharedMemory block not yet unlinked
+        # Free the pool and shared memory even if close() is never called
+        self._finalizer = weakref.finalize(self, _cleanup, self._executor, self._segments)
+
+    def _reset_shards(self):
+        for shard in self._shards:
+            if shard.shm is not None:
+                self._retired.append(shard.shm)
+        self._release_retired()
+        self._shards = [_Shard() for _ in range(self.shard_count)]
+        self._dim = None
+        self._indexed = 0
+        self._indexed_list = self.vector_memory
+
+    def _release_retired(self):
+        if self._inflight:
+            return
+        for shm in self._retired:
+            shm.close()
+            shm.unlink()
+            self._segments.discard(shm)
+        self._retired = []
+
+    def _grow(self, shard):
+        capacity = max(self.initial_capacity, shard.capacity * 2)
+        shm = SharedMemory(create=True, size=capacity * self._dim * 4)
+        self._segments.add(shm)
+        if shard.shm is not None:
+            rows = np.ndarray((capacity, self._dim), dtype=np.float32, buffer=shm.buf)
+            rows[:shard.count] = shard.rows(self._dim)[:shard.count]
+            self._retired.append(shard.shm)
+            self._release_retired()
+        shard.shm = shm
+        shard.capacity = capacity
+
+    def _index(self, position):
+        vector = _normalize(self.vector_memory[position]['vector'])
+        if self._dim is None:
+            self._dim = len(vector)
+        elif len(vector) != self._dim:
+            raise ValueError(f"Embedding size {len(vector)} does not match store size {self._dim}")
+
+        # Route to the least loaded shard to keep them balanced
+        shard = min(self._shards, key=lambda s: s.count)
+        if shard.count == shard.capacity:
+            self._grow(shard)
+        shard.rows(self._dim)[shard.count] = vector
+        shard.ids.append(position)
+        shard.count += 1
+
+    def _sync_shards(self):
+        # vector_memory may have been replaced or extended behind our back
+        # (e.g. by a snapshot load), so catch the shards up before use
+        if self._indexed_list is not self.vector_memory or self._indexed > len(self.vector_memory):
+            self._reset_shards()
+        while self._indexed < len(self.vector_memory):
+            self._index(self._indexed)
+            self._indexed += 1
+
+    async def store_memory(self, text):
+        await super().store_memory(text)
+        self._sync_shards()
+
+    async def retrieve_relevant_context(self, query, k=3):
+        if not self.vector_memory:
+            return []  # Return empty list if no memories exist
+
+        self._inflight += 1
+        try:
+            self._sync_shards()
+            memories = self.vector_memory
+            shards = [(index, shard) for index, shard in enumerate(self._shards) if shard.count]
+            query_embedding = _normalize(await self.embed_text(query))
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    self._executor, _shard_top_k,
+                    index, shard.shm.name, shard.count, self._dim, query_embedding, k
+                )
+                for index, shard in shards
+            ])
+
+            candidates = (
+                (score, shard.ids[row])
+                for (_, shard), local in zip(shards, results)
+                for score, row in local
+            )
+            return [memories[position]['text']
+                    for _, position in heapq.nlargest(k, candidates)]
+        except Exception as e:
+            print(f"Error retrieving context: {str(e)}")
+            return []  # Return empty list on error
+        finally:
+            self._inflight -= 1
+            self._release_retired()
+
+    def close(self):
+        self._finalizer()
+        self._shards = [_Shard() for _ in range(self.shard_count)]
+        self._retired = []
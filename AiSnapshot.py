@@ -0,0 +1,270 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+# Binary snapshot of an agent's memory state (SimpleAgent or AiMemoryManager).
+#
+# Layout (little endian):
+#   header   MAGIC, u16 version, u8 kind (full/delta), u32 dim,
+#            u64 base vector count, u64 base summary count, u32 base text crc
+#   sections tag(4) | u64 length | payload | u32 crc32(payload)
+#       META  json: role/goal of the agent and memory service, counts
+#       VECS  raw float32 block, rows x dim
+#       TEXT  framed texts (u32 length + utf-8) for the vector memories
+#       SUMM  framed SummarizedMemory entries
+#       RECT  json recent_interactions
+#       END
+#
+# A delta snapshot only carries the vectors/texts/summaries appended since the
+# mark returned by a previous save or load, and is only applied on top of an
+# agent whose memory still matches that mark.
+
+MAGIC = b"LASNAP"
+VERSION = 1
+KIND_FULL = 0
+KIND_DELTA = 1
+
+_HEADER = struct.Struct("<6sHBIQQI")
+_SECTION = struct.Struct("<4sQ")
+_CRC = struct.Struct("<I")
+_LEN = struct.Struct("<I")
+_CHUNK_ROWS = 4096
+_CHUNK_BYTES = 1 << 20
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SnapshotMark:
+    vector_count: int
+    summary_count: int
+    text_crc: int
+
+
+def _memory_of(agent):
+    return getattr(agent, 'memory_service', agent)
+
+
+def _frame_texts(texts):
+    return [_LEN.pack(len(data)) + data for data in (t.encode('utf-8') for t in texts)]
+
+
+def _text_crc(vector_memory, start=0, end=None, crc=0):
+    for frame in _frame_texts(m['text'] for m in vector_memory[start:end]):
+        crc = zlib.crc32(frame, crc)
+    return crc
+
+
+def snapshot_mark(agent):
+    memory = _memory_of(agent)
+    return SnapshotMark(
+        len(memory.vector_memory),
+        len(memory.SummarizedMemory),
+        _text_crc(memory.vector_memory)
+    )
+
+
+def _write_section(fp, tag, chunks, length):
+    fp.write(_SECTION.pack(tag, length))
+    crc = 0
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        fp.write(chunk)
+    fp.write(_CRC.pack(crc))
+
+
+def _vector_chunks(memories, dim):
+    for start in range(0, len(memories), _CHUNK_ROWS):
+        rows = [m['vector'] for m in memories[start:start + _CHUNK_ROWS]]
+        block = np.asarray(rows, dtype='<f4').reshape(len(rows), dim)
+        yield block.tobytes()
+
+
+def save_snapshot(agent, fp, since=None):
+    """Stream the agent's memory to the binary file object `fp`.
+
+    Pass the mark from an earlier save/load as `since` to write a delta.
+    Returns the mark describing the state just written.
+    """
+    memory = _memory_of(agent)
+    vector_memory = memory.vector_memory
+    summaries = memory.SummarizedMemory
+
+    if since is None:
+        kind, base = KIND_FULL, SnapshotMark(0, 0, 0)
+    else:
+        kind, base = KIND_DELTA, since
+        if (base.vector_count > len(vector_memory)
+                or base.summary_count > len(summaries)
+                or _text_crc(vector_memory, 0, base.vector_count) != base.text_crc):
+            raise SnapshotError("Agent memory no longer matches the base snapshot")
+
+    new_memories = vector_memory[base.vector_count:]
+    new_summaries = summaries[base.summary_count:]
+    dim = len(vector_memory[0]['vector']) if vector_memory else 0
+    # Everything is checked before the first byte goes out
+    for position, memory_entry in enumerate(new_memories, base.vector_count):
+        if len(memory_entry['vector']) != dim:
+            raise SnapshotError(
+                f"Memory {position} has a {len(memory_entry['vector'])} value vector, expected {dim}"
+            )
+
+    fp.write(_HEADER.pack(MAGIC, VERSION, kind, dim,
+                          base.vector_count, base.summary_count, base.text_crc))
+
+    meta = json.dumps({
+        'role': getattr(agent, 'role', None),
+        'goal': getattr(agent, 'goal', None),
+        'memory_role': memory.role,
+        'memory_goal': memory.goal,
+        'vector_count': len(new_memories),
+        'summary_count': len(new_summaries),
+    }).encode('utf-8')
+    _write_section(fp, b"META", [meta], len(meta))
+
+    _write_section(fp, b"VECS", _vector_chunks(new_memories, dim),
+                   len(new_memories) * dim * 4)
+
+    text_frames = _frame_texts(m['text'] for m in new_memories)
+    _write_section(fp, b"TEXT", text_frames, sum(map(len, text_frames)))
+
+    summary_frames = _frame_texts(new_summaries)
+    _write_section(fp, b"SUMM", summary_frames, sum(map(len, summary_frames)))
+
+    recent = json.dumps(memory.recent_interactions).encode('utf-8')
+    _write_section(fp, b"RECT", [recent], len(recent))
+    _write_section(fp, b"END ", [], 0)
+
+    text_crc = base.text_crc
+    for frame in text_frames:
+        text_crc = zlib.crc32(frame, text_crc)
+    return SnapshotMark(len(vector_memory), len(summaries), text_crc)
+
+
+def save_snapshot_file(agent, path, since=None):
+    # Write next to the target and swap it in, so a failed save never
+    # leaves a truncated file in place of the previous snapshot
+    directory = os.path.dirname(os.path.abspath(path))
+    file = tempfile.NamedTemporaryFile('wb', dir=directory, prefix='.snapshot-', delete=False)
+    try:
+        with file:
+            mark = save_snapshot(agent, file, since=since)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+    return mark
+
+
+def _read_exact(fp, size):
+    data = fp.read(size)
+    if len(data) != size:
+        raise SnapshotError("Snapshot is truncated")
+    return data
+
+
+def _read_section(fp, expected_tag, into=None):
+    tag, length = _SECTION.unpack(_read_exact(fp, _SECTION.size))
+    if tag != expected_tag:
+        raise SnapshotError(f"Expected section {expected_tag!r}, found {tag!r}")
+
+    if into is not None and into.nbytes != length:
+        raise SnapshotError(f"Section {tag!r} has an unexpected length")
+
+    crc = 0
+    if into is None or length == 0:
+        # memoryview can't cast an empty (zero-row) array, so read those as bytes
+        payload = _read_exact(fp, length)
+        crc = zlib.crc32(payload)
+    else:
+        # Stream straight into the caller's buffer
+        payload = memoryview(into).cast('B')
+        offset = 0
+        while offset < length:
+            view = payload[offset:offset + _CHUNK_BYTES]
+            read = fp.readinto(view)
+            if not read:
+                raise SnapshotError("Snapshot is truncated")
+            crc = zlib.crc32(view[:read], crc)
+            offset += read
+
+    stored, = _CRC.unpack(_read_exact(fp, _CRC.size))
+    if stored != crc:
+        raise SnapshotError(f"Checksum mismatch in section {tag!r}")
+    return payload
+
+
+def _unframe_texts(payload, count):
+    texts = []
+    offset = 0
+    for _ in range(count):
+        size, = _LEN.unpack_from(payload, offset)
+        offset += _LEN.size
+        texts.append(bytes(payload[offset:offset + size]).decode('utf-8'))
+        offset += size
+    if offset != len(payload):
+        raise SnapshotError("Framed text section has trailing data")
+    return texts
+
+
+def load_snapshot(agent, fp):
+    """Restore memory from the binary file object `fp` without re-embedding.
+
+    Full snapshots replace the agent's memory, deltas extend it. Nothing is
+    changed unless the whole snapshot reads back cleanly.
+    Returns the mark describing the restored state.
+    """
+    memory = _memory_of(agent)
+    magic, version, kind, dim, base_vectors, base_summaries, base_crc = \
+        _HEADER.unpack(_read_exact(fp, _HEADER.size))
+    if magic != MAGIC:
+        raise SnapshotError("Not an agent snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    if kind == KIND_DELTA:
+        current = snapshot_mark(agent)
+        if current != SnapshotMark(base_vectors, base_summaries, base_crc):
+            raise SnapshotError("Delta snapshot does not apply to the current agent memory")
+        if memory.vector_memory and len(memory.vector_memory[0]['vector']) != dim:
+            raise SnapshotError("Delta snapshot vector size does not match agent memory")
+    elif kind != KIND_FULL:
+        raise SnapshotError(f"Unknown snapshot kind {kind}")
+
+    meta = json.loads(_read_section(fp, b"META"))
+    vectors = np.empty((meta['vector_count'], dim), dtype='<f4')
+    _read_section(fp, b"VECS", into=vectors)
+    texts = _unframe_texts(_read_section(fp, b"TEXT"), meta['vector_count'])
+    summaries = _unframe_texts(_read_section(fp, b"SUMM"), meta['summary_count'])
+    recent = json.loads(_read_section(fp, b"RECT"))
+    _read_section(fp, b"END ")
+
+    restored = [{'text': text, 'vector': vector} for text, vector in zip(texts, vectors)]
+    if kind == KIND_FULL:
+        memory.vector_memory = restored
+        memory.SummarizedMemory = summaries
+    else:
+        memory.vector_memory.extend(restored)
+        memory.SummarizedMemory.extend(summaries)
+    memory.recent_interactions = recent
+
+    memory.role = meta['memory_role']
+    memory.goal = meta['memory_goal']
+    if memory is not agent and meta['role'] is not None:
+        agent.role = meta['role']
+        agent.goal = meta['goal']
+
+    return SnapshotMark(
+        len(memory.vector_memory),
+        len(memory.SummarizedMemory),
+        _text_crc(memory.vector_memory, base_vectors, crc=base_crc)
+    )
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from AiDeadline import TurnDeadline
+from MainAi import SimpleAgent
+
+# Checks for the per-turn deadline and how SimpleAgent.think degrades, run with:
+# python DeadlineTest.py
+# The Cohere clients are replaced by a stub with configurable delays.
+
+class StubLLM:
+    def __init__(self, decision='no', answer_delay=0.0):
+        self.decision = decision
+        self.answer_delay = answer_delay
+        self.max_tokens = []
+
+    def generate(self, model, prompt, max_tokens, temperature):
+        if "Answer with just 'yes' or 'no'" in prompt:
+            text = self.decision
+        else:
+            self.max_tokens.append(max_tokens)
+            time.sleep(self.answer_delay)
+            text = "generated answer"
+        return SimpleNamespace(generations=[SimpleNamespace(text=text)])
+
+    def embed(self, texts, model, input_type):
+        return SimpleNamespace(embeddings=[[1.0, float(len(texts[0]))]])
+
+def make_agent(llm, turn_seconds=1.0):
+    agent = SimpleAgent("test", "Ai Assistant", "Answer the question", turn_seconds=turn_seconds)
+    agent.llm = agent.memory_service.llm = agent.tool_agent.llm = llm
+    agent.step_limits = {'retrieval': 0.2, 'tool decision': 0.2, 'tools': 0.2}
+    agent.generation_reserve = 0.2
+    return agent
+
+def actions(agent, step):
+    return [d['action'] for d in agent.turn_log[-1] if d['step'] == step]
+
+async def test_skip_when_allowance_below_minimum():
+    ran = []
+
+    async def step():
+        ran.append(True)
+
+    deadline = TurnDeadline(1.0)
+    ok, result = await deadline.run('retrieval', step(), limit=0.05, minimum=0.1)
+    assert (ok, result) == (False, None)
+    assert ran == []
+    assert [d['action'] for d in deadline.decisions] == ['skipped']
+
+async def test_timeout_is_recorded():
+    deadline = TurnDeadline(1.0)
+    ok, _ = await deadline.run('tools', asyncio.sleep(1.0), limit=0.1)
+    assert not ok
+    assert [(d['step'], d['action']) for d in deadline.decisions] == [('tools', 'timed out')]
+
+async def test_run_returns_result():
+    deadline = TurnDeadline(1.0)
+    assert await deadline.run('retrieval', asyncio.sleep(0, result="x"), limit=0.5) == (True, "x")
+    assert deadline.decisions == []
+
+async def test_max_tokens_shrinks_with_time_left():
+    llm = StubLLM()
+    agent = make_agent(llm, turn_seconds=2.0)
+    agent.tokens_per_second = 40   # 2s affords at most 80 tokens
+    assert await agent.think("hello") == "generated answer"
+    assert 'shrunk max_tokens' in actions(agent, 'generation')
+    assert agent.min_tokens <= llm.max_tokens[-1] <= 80
+    await agent.flush_memory()
+
+async def test_fallback_to_tool_result():
+    agent = make_agent(StubLLM(decision='yes', answer_delay=1.5))
+
+    async def tool_think(input_text):
+        return "tool result"
+    agent.tool_agent.think = tool_think
+
+    response = await agent.think("what time is it")
+    assert response.endswith("Final response: tool result")
+    assert 'fallback' in actions(agent, 'generation')
+    await agent.flush_memory()
+    assert agent.memory_service.vector_memory == []  # fallbacks aren't remembered
+
+async def test_fallback_to_retrieved_context():
+    agent = make_agent(StubLLM(answer_delay=1.5))
+    await agent.memory_service.store_memory("the dragon lives in the cave")
+    response = await agent.think("where is the dragon")
+    assert response.startswith("Here is what I remember")
+    assert "the dragon lives in the cave" in response
+    assert actions(agent, 'memory') == ['skipped']
+    assert len(agent.memory_service.vector_memory) == 1
+
+async def test_fallback_with_nothing_available():
+    agent = make_agent(StubLLM(answer_delay=1.5))
+    assert await agent.think("hello") == "Sorry, I ran out of time to answer that."
+    assert actions(agent, 'generation')[-1] == 'fallback'
+
+async def test_slow_memory_update_is_deferred_once():
+    agent = make_agent(StubLLM())
+    manage_memory = agent.memory_service.ManageMemory
+
+    async def slow_manage_memory(*args):
+        await asyncio.sleep(1.2)
+        await manage_memory(*args)
+    agent.memory_service.ManageMemory = slow_manage_memory
+
+    assert await agent.think("hello") == "generated answer"
+    assert actions(agent, 'memory') == ['deferred']
+    await agent.flush_memory()
+    assert len(agent.memory_service.vector_memory) == 1
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            asyncio.run(check())
+            print(f"{name}: ok")
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+import tracemalloc
+import warnings
+from types import SimpleNamespace
+
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from AiFootprint import FootprintMonitor, measure_memory, profile_allocations
+from AiMemory import AiMemoryManager
+
+# Checks for AiFootprint, run with: python FootprintTest.py
+# Embeddings come from a stub client, so no API key is needed.
+
+DIM = 256
+
+class StubClient:
+    def embed(self, texts, model, input_type):
+        return SimpleNamespace(embeddings=[[float(i) for i in range(DIM)]])
+
+async def make_memory(count):
+    memory = AiMemoryManager("test", "Memory Manager", "Store and retrieve relevant context")
+    memory.llm = StubClient()
+    for i in range(count):
+        await memory.store_memory(f"memory number {i}")
+    return memory
+
+async def test_measure_memory():
+    memory = await make_memory(10)
+    report = measure_memory(memory)
+    vector = memory.vector_memory[0]['vector']
+    assert report['memories'] == 10
+    assert report['vectors'] == 10 * (sys.getsizeof(vector) + DIM * sys.getsizeof(0.0))
+    assert report['total'] == sum(report[key] for key in
+                                  ['vectors', 'texts', 'summaries', 'recent', 'caches'])
+
+async def test_soft_limit_compacts_first():
+    memory = await make_memory(10)
+    before = measure_memory(memory)['total']
+    hooked = []
+    monitor = FootprintMonitor(memory, soft_limit=before - 1,
+                               on_limit=lambda agent, report: hooked.append(report))
+    report = monitor.sample()
+    # float32 packing brings it back under the limit, so the hook stays quiet
+    assert report['total'] < before - 1
+    assert hooked == []
+    assert all(m['vector'].dtype.name == 'float32' for m in memory.vector_memory)
+
+async def test_soft_limit_calls_hook_or_warns():
+    memory = await make_memory(10)
+    hooked = []
+    monitor = FootprintMonitor(memory, soft_limit=1, compact=False,
+                               on_limit=lambda agent, report: hooked.append(report))
+    monitor.sample()
+    assert len(hooked) == 1 and hooked[0]['total'] > 1
+
+    monitor = FootprintMonitor(memory, soft_limit=1)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        monitor.sample()
+    assert [w.category for w in caught] == [RuntimeWarning]
+
+async def test_maybe_sample_waits_for_interval():
+    memory = await make_memory(1)
+    monitor = FootprintMonitor(memory, interval=60)
+    assert monitor.maybe_sample() is not None
+    assert monitor.maybe_sample() is None
+    assert len(monitor.samples) == 1
+
+async def test_profile_allocations_restores_memory_service():
+    memory = await make_memory(0)
+    with profile_allocations(memory) as profile:
+        await memory.store_memory("profiled")
+    assert profile.calls == {'store_memory': 1}
+    assert 'store_memory' not in vars(memory)
+    assert not tracemalloc.is_tracing()
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            asyncio.run(check())
+            print(f"{name}: ok")
@@ -2,6 +2,8 @@ import os
 from typing import List
 
 import asyncio
+from collections import deque
+from contextlib import ExitStack
 import cohere
 from cohere.types import tool
 from langchain_community.chat_models import ChatCohere
@@ -9,7 +11,11 @@ from langchain_community.llms import Cohere
 from pydantic import BaseModel
 
 from AITools import  ToolManager
+from AiDeadline import CLIENT_TIMEOUT, TurnDeadline
+from AiFootprint import FootprintMonitor, profile_allocations
 from AiMemory import AiMemoryManager
+from AiShardedMemory import ShardedMemoryManager
+from AiSnapshot import load_snapshot, save_snapshot_file
 
 from dotenv import load_dotenv
 
@@ -21,7 +27,7 @@ CKey = os.environ["COHERE_API_KEY"]
     
 class ToolAgent:
     def __init__(self, api_key, role, goal):
-        self.llm = cohere.Client(api_key)
+        self.llm = cohere.Client(api_key, timeout=CLIENT_TIMEOUT)
         self.role = role
         self.goal = goal
         self.tool_manager = ToolManager()
@@ -42,12 +48,13 @@ class ToolAgent:
         User Input: {input_text}
         Which tool should I use? Respond with just the tool name or 'none':"""
         
-        tool_choice = self.llm.generate(
+        tool_choice = (await asyncio.to_thread(
+            self.llm.generate,
             model='command',
             prompt=tool_selection_prompt,
             max_tokens=50,
             temperature=0.2
-        ).generations[0].text.strip().lower()
+        )).generations[0].text.strip().lower()
         
         if tool_choice in self.tool_manager.tools:
             # Prepare tool-specific parameters
@@ -68,7 +75,8 @@ class ToolAgent:
             User Input: {input_text}
             Generate a helpful response:"""
             
-            response = self.llm.generate(
+            response = await asyncio.to_thread(
+                self.llm.generate,
                 model='command',
                 prompt=response_prompt,
                 max_tokens=300,
@@ -81,7 +89,8 @@ class ToolAgent:
     async def direct_response(self, input_text):
         # Handle responses without tools
         prompt = f"{self.role}\nGoal: {self.goal}\nInput: {input_text}\nResponse:"
-        response = self.llm.generate(
+        response = await asyncio.to_thread(
+            self.llm.generate,
             model='command',
             prompt=prompt,
             max_tokens=300,
@@ -90,16 +99,50 @@ class ToolAgent:
         return response.generations[0].text
 
 class SimpleAgent:
-    def __init__(self, api_key, role, goal):
-        self.llm = cohere.Client(api_key)
+    def __init__(self, api_key, role, goal, memory_shards=None, turn_seconds=30.0):
+        self.llm = cohere.Client(api_key, timeout=CLIENT_TIMEOUT)
         self.role = role
         self.goal = goal
-        self.memory_service = AiMemoryManager(api_key, "Memory Manager", "Store and retrieve relevant context")
+        # Time budget for one call to think, and the most each step may take of it
+        self.turn_seconds = turn_seconds
+        self.step_limits = {'retrieval': 3.0, 'tool decision': 3.0, 'tools': 12.0}
+        self.generation_reserve = 6.0  # kept back for the final answer
+        self.tokens_per_second = 40    # used to shrink max_tokens when time is short
+        self.min_tokens = 50
+        self.turn_log = deque(maxlen=100)  # degradation decisions of recent turns
+        self._pending_memory = None
+        if memory_shards:
+            # Large shared stores: search the vectors across a process pool
+            self.memory_service = ShardedMemoryManager(api_key, "Memory Manager", "Store and retrieve relevant context", shards=memory_shards)
+        else:
+            self.memory_service = AiMemoryManager(api_key, "Memory Manager", "Store and retrieve relevant context")
         self.tool_agent = ToolAgent(api_key, "Tool Assistant", "Help the SimpleAgent AiAgent with specific tasks using tools")
 
-    async def think(self, input_text):
-        Context = await self.memory_service.retrieve_relevant_context(input_text, k=5)
-        
+    def save_snapshot(self, path, since=None):
+        # Pass the mark from a previous save/load as `since` to write a delta
+        return save_snapshot_file(self, path, since=since)
+
+    def load_snapshot(self, path):
+        with open(path, 'rb') as file:
+            return load_snapshot(self, file)
+
+    def close(self):
+        # Sharded memory holds a process pool and shared memory segments
+        if hasattr(self.memory_service, 'close'):
+            self.memory_service.close()
+
+    async def think(self, input_text, turn_seconds=None):
+        deadline = TurnDeadline(turn_seconds or self.turn_seconds)
+        reserve = self.generation_reserve
+
+        # Each step degrades instead of failing: no context, no tools, shorter answer
+        found, Context = await deadline.run(
+            'retrieval', self.memory_service.retrieve_relevant_context(input_text, k=5),
+            self.step_limits['retrieval'], reserve
+        )
+        if not found:
+            Context = []
+
         tool_decision_prompt = f"""
         {self.role}
         Goal: {self.goal}
@@ -107,59 +150,162 @@ class SimpleAgent:
         Available Tools: {self.tool_agent.get_tool_descriptions()}
         Input: {input_text}
         Should we use tools for this task? Answer with just 'yes' or 'no':"""
-        
-        need_tools = self.llm.generate(
-            model='command',
-            prompt=tool_decision_prompt,
-            max_tokens=50,
-            temperature=0.2
-        ).generations[0].text.strip().lower()
 
+        decided, decision = await deadline.run(
+            'tool decision', asyncio.to_thread(
+                self.llm.generate,
+                model='command',
+                prompt=tool_decision_prompt,
+                max_tokens=50,
+                temperature=0.2
+            ),
+            self.step_limits['tool decision'], reserve
+        )
+        need_tools = decision.generations[0].text.strip().lower() if decided else 'no'
+
+        tool_response = None
         if 'yes' in need_tools:
-            tool_response = await self.tool_agent.think(input_text)
-            
+            used, tool_response = await deadline.run(
+                'tools', self.tool_agent.think(input_text),
+                self.step_limits['tools'], reserve
+            )
+            if not used:
+                tool_response = None
+
+        if tool_response is not None:
             prompt = f"""{self.role}
                     \nGoal: {self.goal}
                     \nContext: {Context}
                     \nInput: {input_text}
                     \nTool Result: {tool_response}
                     \nUsing the tool's result, answer the initial query:"""
-            
-            final_response = self.llm.generate(
+        else:
+            prompt = f"""{self.role}
+                    \nGoal: {self.goal}
+                    \nContext: {Context}
+                    \nInput: {input_text}
+                    \nResponse:"""
+
+        max_tokens = 300
+        affordable = int(deadline.remaining() * self.tokens_per_second)
+        if affordable < max_tokens:
+            max_tokens = max(self.min_tokens, affordable)
+            deadline.record('generation', 'shrunk max_tokens', f"300 -> {max_tokens}")
+
+        generated, response = await deadline.run(
+            'generation', asyncio.to_thread(
+                self.llm.generate,
                 model='command',
                 prompt=prompt,
-                max_tokens=300,
+                max_tokens=max_tokens,
                 temperature=0.7
-            ).generations[0].text
-            
+            ),
+            deadline.remaining()
+        )
+        if generated:
+            final_response = response.generations[0].text
+        elif tool_response is not None:
+            final_response = tool_response
+            deadline.record('generation', 'fallback', "answered with the tool result")
+        elif Context:
+            final_response = "Here is what I remember that may help:\n" + "\n".join(Context)
+            deadline.record('generation', 'fallback', "answered with retrieved context")
+        else:
+            final_response = "Sorry, I ran out of time to answer that."
+            deadline.record('generation', 'fallback', "nothing available to answer with")
+
+        if generated:
+            await self._remember(deadline, input_text, tool_response if tool_response is not None else "No tools used", final_response)
+        else:
+            # Fallback text isn't something the assistant said; storing it would
+            # re-embed old memories as new ones
+            deadline.record('memory', 'skipped', "answer was a fallback, not stored")
+        self.turn_log.append(deadline.decisions)
+
+        if tool_response is not None:
             TroubleshootingResponse = f"\nTool Response: {tool_response}\n\nFinal response: {final_response}"
-            await self.memory_service.ManageMemory(input_text, tool_response, final_response)
             return TroubleshootingResponse #final_response
-        else:
-            response = self.llm.generate(
-                model='command',
-                prompt=f"""{self.role}
-                        \nGoal: {self.goal}
-                        \nContext: {Context}
-                        \nInput: {input_text}
-                        \nResponse:""",
-                max_tokens=300,
-                temperature=0.7
-            )
-            await self.memory_service.ManageMemory(input_text, "No tools used", response.generations[0].text)
-            return response.generations[0].text
+        return final_response
+
+    async def _remember(self, deadline, input_text, tools, response_text):
+        # Memory updates run in order; one that does not fit in the turn keeps
+        # going in the background instead of holding up the answer
+        previous = self._pending_memory
+        if previous is not None and previous.done():
+            previous = None
+
+        async def store():
+            nonlocal previous
+            if previous is not None:
+                await previous
+                previous = None  # don't keep finished turns alive
+            await self.memory_service.ManageMemory(input_text, tools, response_text)
+
+        self._pending_memory = asyncio.create_task(store())
+        timeout = deadline.remaining()
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._pending_memory), timeout)
+                return
+            except asyncio.TimeoutError:
+                pass
+        deadline.record('memory', 'deferred', "finishing in the background")
+
+    async def flush_memory(self):
+        # Wait for any memory update still running from the last turn
+        if self._pending_memory is not None:
+            await self._pending_memory
+            self._pending_memory = None
             
 
 async def main():
 
     agent = SimpleAgent(CKey, "Ai Assistant", "Use any tools at your disposal to answer the user's question")
 
-    while True:
-        user_input = input("User: ")
-        if user_input.lower() == 'exit':
-            break
-        response = await agent.think(user_input)
-        print(f"\nAssistant: {response}\n")
+    # Optional soft limit on the agent's memory, compacted/warned about past it
+    soft_limit = None
+    soft_limit_mb = os.environ.get("AGENT_MEMORY_SOFT_LIMIT_MB")
+    if soft_limit_mb:
+        try:
+            soft_limit = float(soft_limit_mb) * 1024 * 1024
+        except ValueError:
+            pass
+        if soft_limit is None or not soft_limit > 0:
+            print(f"Ignoring AGENT_MEMORY_SOFT_LIMIT_MB={soft_limit_mb!r}: expected a positive number of MB")
+            soft_limit = None
+    monitor = FootprintMonitor(agent, soft_limit=soft_limit)
+    profiling = None
+
+    try:
+        while True:
+            # Read input on a thread so deferred memory updates can finish meanwhile
+            user_input = await asyncio.to_thread(input, "User: ")
+            if user_input.lower() == 'exit':
+                break
+            if user_input.lower() == '/memory':
+                print(f"\n{monitor.format_report()}\n")
+                continue
+            if user_input.lower() == '/memory profile':
+                # Toggle allocation profiling of the memory storage paths
+                if profiling is None:
+                    profiling = ExitStack()
+                    profile = profiling.enter_context(profile_allocations(agent))
+                    print("\nProfiling memory allocations, send '/memory profile' again to stop\n")
+                else:
+                    profiling.close()
+                    profiling = None
+                    print(f"\n{profile.format_report()}\n")
+                continue
+            response = await agent.think(user_input)
+            print(f"\nAssistant: {response}\n")
+            monitor.maybe_sample()
+    finally:
+        # Stop tracemalloc and unwrap the memory service if still profiling
+        if profiling is not None:
+            profiling.close()
+        # Don't let asyncio.run cancel the last turn's memory update
+        await agent.flush_memory()
+        agent.close()
             
 # Run the async function
 if __name__ == "__main__":
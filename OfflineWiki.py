@@ -0,0 +1,348 @@
+import argparse
+import bisect
+import difflib
+import gzip
+import mmap
+import random
+import re
+import struct
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from array import array
+
+import numpy as np
+
+# Offline Wikipedia lookups over a local abstracts dump
+# (e.g. enwiki-latest-abstract.xml[.gz] from dumps.wikimedia.org).
+#
+# build_index turns the dump into one file that is memory-mapped at lookup time:
+#   header | abstracts | strings (titles, keys) | docs table | sorted keys table
+#   | trigram hashes | trigram posting starts | postings
+# Keys are normalised titles plus any redirects, sorted by their utf-8 bytes,
+# so a lookup is a binary search over fixed-width records in the mapped file.
+# For fuzzy matching every article title is also listed under the (crc32
+# hashed) character trigrams it contains, so a typo anywhere in a title still
+# shares most of its trigrams with the query.
+
+MAGIC = b"LAWIKI02"
+# magic, docs, keys, docs offset, keys offset,
+# trigrams, trigram hashes offset, posting starts offset, postings offset
+_HEADER = struct.Struct("<8sQQQQQQQQ")
+_DOC = struct.Struct("<QIQI")        # title offset/length, abstract offset/length
+_KEY = struct.Struct("<QII")         # key offset/length, doc number
+_MAX_POSTINGS = 50000   # trigrams in more titles than this are too common to help
+_FUZZY_CANDIDATES = 50
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[\w'()-]+")
+_MAX_TITLE_WORDS = 8
+# Words that never identify a topic on their own
+_STOP_WORDS = frozenset("""
+a about an and any are as at be been but by can could did do does for from
+give had has have he her his how i if in into is it its me more most my no
+not of on or our please she show so some tell than that the their them then
+there these they this to us was we were what when where which who whom whose
+why will with would you your explain describe know find search look up
+information info
+""".split())
+
+
+def normalize_title(title):
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+
+def _trigrams(key):
+    padded = f" {key} "
+    return {zlib.crc32(padded[i:i + 3].encode('utf-8')) for i in range(len(padded) - 2)}
+
+
+def _align(out):
+    # Keep the numpy tables 8 byte aligned in the mapped file
+    out.write(b"\0" * (-out.tell() % 8))
+
+
+def _open_dump(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _read_dump(path):
+    with _open_dump(path) as dump:
+        root = None
+        for event, element in ET.iterparse(dump, events=('start', 'end')):
+            if root is None:
+                root = element
+            if event != 'end' or element.tag != 'doc':
+                continue
+            title = element.findtext('title') or ''
+            if title.startswith('Wikipedia: '):
+                title = title[len('Wikipedia: '):]
+            abstract = (element.findtext('abstract') or '').strip()
+            # Drop the finished docs from the tree so memory stays flat
+            root.clear()
+            if title:
+                yield title, abstract
+
+
+def _read_redirects(path):
+    # One "source<TAB>target" pair per line
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) == 2:
+                yield parts[0], parts[1]
+
+
+def build_index(dump_path, index_path, redirects_path=None):
+    docs = []   # (title bytes, abstract offset, abstract length)
+    keys = {}   # key bytes -> doc number
+    redirects = set()
+
+    with open(index_path, 'wb') as out:
+        out.write(b"\0" * _HEADER.size)
+
+        # Abstracts are streamed straight to disk as the dump is parsed
+        for title, abstract in _read_dump(dump_path):
+            key = normalize_title(title).encode('utf-8')
+            if key in keys:
+                continue
+            data = abstract.encode('utf-8')
+            keys[key] = len(docs)
+            docs.append((title.encode('utf-8'), out.tell(), len(data)))
+            out.write(data)
+
+        if redirects_path:
+            for source, target in _read_redirects(redirects_path):
+                source = normalize_title(source).encode('utf-8')
+                doc = keys.get(normalize_title(target).encode('utf-8'))
+                if doc is not None and source not in keys:
+                    keys[source] = doc
+                    redirects.add(source)
+
+        title_offsets = []
+        for title, _, _ in docs:
+            title_offsets.append(out.tell())
+            out.write(title)
+        sorted_keys = sorted(keys)
+        key_offsets = []
+        for key in sorted_keys:
+            key_offsets.append(out.tell())
+            out.write(key)
+
+        docs_offset = out.tell()
+        for (title, abstract_offset, abstract_length), title_offset in zip(docs, title_offsets):
+            out.write(_DOC.pack(title_offset, len(title), abstract_offset, abstract_length))
+        keys_offset = out.tell()
+        for key, key_offset in zip(sorted_keys, key_offsets):
+            out.write(_KEY.pack(key_offset, len(key), keys[key]))
+
+        # Trigram postings: sort (hash, key position) pairs packed into one
+        # uint64 so each trigram's titles end up contiguous
+        pairs = array('Q')
+        for position, key in enumerate(sorted_keys):
+            if key not in redirects:
+                pairs.extend(gram << 32 | position for gram in _trigrams(key.decode('utf-8')))
+        pairs = np.array(pairs, dtype=np.uint64)
+        pairs.sort()
+        hashes = (pairs >> np.uint64(32)).astype('<u4')
+        gram_hashes, starts = np.unique(hashes, return_index=True)
+        starts = np.append(starts, len(pairs)).astype('<u8')
+
+        _align(out)
+        grams_offset = out.tell()
+        out.write(gram_hashes.astype('<u4').tobytes())
+        _align(out)
+        starts_offset = out.tell()
+        out.write(starts.tobytes())
+        postings_offset = out.tell()
+        out.write((pairs & np.uint64(0xFFFFFFFF)).astype('<u4').tobytes())
+
+        out.seek(0)
+        out.write(_HEADER.pack(MAGIC, len(docs), len(sorted_keys), docs_offset, keys_offset,
+                               len(gram_hashes), grams_offset, starts_offset, postings_offset))
+
+    return len(docs), len(sorted_keys)
+
+
+class _Keys:
+    # Sequence view of the sorted keys so bisect can search the mapped file
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.key_count
+
+    def __getitem__(self, position):
+        return self.index._key(position)[0]
+
+
+class OfflineWikiIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.doc_count, self.key_count, self._docs_offset, self._keys_offset,
+         gram_count, grams_offset, starts_offset, postings_offset) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not an offline Wikipedia index (rebuild it with OfflineWiki.py build)")
+        self._keys = _Keys(self)
+        self._gram_hashes = np.frombuffer(self._map, dtype='<u4', count=gram_count, offset=grams_offset)
+        self._gram_starts = np.frombuffer(self._map, dtype='<u8', count=gram_count + 1, offset=starts_offset)
+        self._postings = np.frombuffer(self._map, dtype='<u4', count=int(self._gram_starts[-1]),
+                                       offset=postings_offset)
+
+    def close(self):
+        # The numpy views hold the map open, so drop them first
+        self._gram_hashes = self._gram_starts = self._postings = None
+        self._map.close()
+
+    def _key(self, position):
+        offset, length, doc = _KEY.unpack_from(self._map, self._keys_offset + position * _KEY.size)
+        return self._map[offset:offset + length], doc
+
+    def _doc(self, doc):
+        title_offset, title_length, abstract_offset, abstract_length = \
+            _DOC.unpack_from(self._map, self._docs_offset + doc * _DOC.size)
+        title = self._map[title_offset:title_offset + title_length].decode('utf-8')
+        abstract = self._map[abstract_offset:abstract_offset + abstract_length].decode('utf-8')
+        return title, abstract
+
+    def lookup(self, title):
+        # Exact (normalised) title or redirect match, None if missing
+        key = normalize_title(title).encode('utf-8')
+        position = bisect.bisect_left(self._keys, key)
+        if position < self.key_count:
+            found, doc = self._key(position)
+            if found == key:
+                return self._doc(doc)
+        return None
+
+    def fuzzy_lookup(self, title, cutoff=0.6):
+        # Titles sharing the most trigrams with the query, best one by difflib
+        key = normalize_title(title)
+        if not key:
+            return None
+        postings = []
+        for gram in _trigrams(key):
+            i = int(np.searchsorted(self._gram_hashes, gram))
+            if i < len(self._gram_hashes) and self._gram_hashes[i] == gram:
+                start, end = int(self._gram_starts[i]), int(self._gram_starts[i + 1])
+                postings.append((end - start, start, end))
+        if not postings:
+            return None
+
+        # Skip the very common trigrams unless they are all there is
+        postings.sort()
+        usable = [p for p in postings if p[0] <= _MAX_POSTINGS] or postings[:1]
+        positions, shared = np.unique(
+            np.concatenate([self._postings[start:end] for _, start, end in usable]),
+            return_counts=True
+        )
+        best_positions = positions[np.argsort(-shared, kind='stable')[:_FUZZY_CANDIDATES]]
+
+        candidates = {}
+        for position in best_positions:
+            found, doc = self._key(int(position))
+            candidates[found.decode('utf-8')] = doc
+        best = difflib.get_close_matches(key, list(candidates), n=1, cutoff=cutoff)
+        return self._doc(candidates[best[0]]) if best else None
+
+    def search(self, query):
+        # Queries are whole user sentences, so try every run of words that has
+        # something besides stop words in it and keep the best ranked title:
+        # most content words, then most capitalised (name-like) words, then
+        # longest, then leftmost.
+        words = _WORD.findall(query)
+        content = [word.casefold() not in _STOP_WORDS for word in words]
+        best, best_rank = None, None
+        for start in range(len(words)):
+            for size in range(1, min(_MAX_TITLE_WORDS, len(words) - start) + 1):
+                span = range(start, start + size)
+                content_words = sum(content[i] for i in span)
+                if not content_words:
+                    continue
+                # The first word of a sentence is capitalised anyway
+                capitalised = sum(content[i] and i > 0 and words[i][:1].isupper() for i in span)
+                rank = (content_words, capitalised, size, -start)
+                if best_rank is not None and rank <= best_rank:
+                    continue
+                result = self.lookup(" ".join(words[start:start + size]))
+                if result is not None:
+                    best, best_rank = result, rank
+        if best is None:
+            # Titles made only of stop words ("The Who") when asked for directly
+            best = self.lookup(" ".join(words))
+        if best is not None:
+            return best
+        return self.fuzzy_lookup(" ".join(word for word, keep in zip(words, content) if keep))
+
+    def summary(self, query, sentences=3):
+        result = self.search(query)
+        if result is None:
+            return None
+        title, abstract = result
+        return title, " ".join(_SENTENCE_END.split(abstract)[:sentences])
+
+
+def _typo(title, rng):
+    # One random edit at a random position: delete, insert, replace or swap
+    if len(title) < 2:
+        return title
+    i = rng.randrange(len(title) - 1)
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    edit = rng.randrange(4)
+    if edit == 0:
+        return title[:i] + title[i + 1:]
+    if edit == 1:
+        return title[:i] + letter + title[i:]
+    if edit == 2:
+        return title[:i] + letter + title[i + 1:]
+    return title[:i] + title[i + 1] + title[i] + title[i + 2:]
+
+
+def _benchmark(index_path, lookups):
+    rng = random.Random(0)
+    index = OfflineWikiIndex(index_path)
+    titles = [index._doc(rng.randrange(index.doc_count))[0] for _ in range(lookups)]
+    typos = [_typo(title, rng) for title in titles]
+
+    for name, queries, method in [('exact', titles, index.lookup),
+                                  ('fuzzy', typos, index.fuzzy_lookup)]:
+        timings = []
+        correct = 0
+        for query, title in zip(queries, titles):
+            start = time.perf_counter()
+            result = method(query)
+            timings.append(time.perf_counter() - start)
+            correct += result is not None and normalize_title(result[0]) == normalize_title(title)
+        timings.sort()
+        print(f"{name}: {len(timings)} lookups, "
+              f"p50 {timings[len(timings) // 2] * 1e6:.1f} us, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us, "
+              f"{correct / len(timings):.1%} found the original title")
+    index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Wikipedia index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Build an index from an abstracts dump")
+    build.add_argument('dump')
+    build.add_argument('index')
+    build.add_argument('--redirects', help="Tab separated source/target redirect titles")
+    bench = commands.add_parser('bench', help="Time lookups against an index")
+    bench.add_argument('index')
+    bench.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        docs, keys = build_index(args.dump, args.index, args.redirects)
+        print(f"Indexed {docs} articles ({keys} titles and redirects) "
+              f"in {time.perf_counter() - start:.1f}s")
+    else:
+        _benchmark(args.index, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from OfflineWiki import OfflineWikiIndex, build_index
+
+# Checks for the offline Wikipedia index, run with: python OfflineWikiTest.py
+# Builds a small abstracts dump with the kind of common-word titles real
+# enwiki has, then checks whole-sentence queries land on the right article.
+
+TITLES = [
+    "Tell Me", "The", "What", "About", "Me", "Capital", "Capital city", "France", "Paris",
+    "Quantum", "Quantum entanglement", "Albert Einstein", "Einstein (disambiguation)",
+    "Python (programming language)", "Alan Turing", "London", "Ada Lovelace",
+] + [f"Filler article {i}" for i in range(2000)]
+
+REDIRECTS = [("Turing", "Alan Turing"), ("Python language", "Python (programming language)")]
+
+def build(directory):
+    dump = os.path.join(directory, "abstract.xml")
+    with open(dump, "w", encoding="utf-8") as file:
+        file.write("<feed>")
+        for title in TITLES:
+            file.write(f"<doc><title>Wikipedia: {escape(title)}</title><url>x</url>"
+                       f"<abstract>{escape(title)} is an article. It has facts.</abstract></doc>")
+        file.write("</feed>")
+    redirects = os.path.join(directory, "redirects.tsv")
+    with open(redirects, "w", encoding="utf-8") as file:
+        file.writelines(f"{source}\t{target}\n" for source, target in REDIRECTS)
+    index = os.path.join(directory, "wiki.idx")
+    build_index(dump, index, redirects)
+    return OfflineWikiIndex(index)
+
+SEARCHES = {
+    "tell me about quantum entanglement": "Quantum entanglement",
+    "tell me about Paris": "Paris",
+    "what is the capital of France": "France",
+    "Who was Alan Turing?": "Alan Turing",
+    "what did turing do": "Alan Turing",
+    "Tell me about the Python language": "Python (programming language)",
+    "Tell Me": "Tell Me",
+}
+
+def test_search(index):
+    for query, expected in SEARCHES.items():
+        title = index.search(query)[0]
+        assert title == expected, f"{query!r} found {title!r}, expected {expected!r}"
+
+TYPOS = {
+    "Elbert Einstein": "Albert Einstein",   # typo in the first letter
+    "Albret Einstein": "Albert Einstein",
+    "Ada Lovelase": "Ada Lovelace",
+    "Lnodon": "London",
+}
+
+def test_fuzzy_lookup(index):
+    for query, expected in TYPOS.items():
+        result = index.fuzzy_lookup(query)
+        assert result is not None and result[0] == expected, f"{query!r} found {result!r}"
+    assert index.fuzzy_lookup("zzzzzzzz") is None
+
+def test_search_falls_back_to_fuzzy(index):
+    assert index.search("who was Elbert Einstein")[0] == "Albert Einstein"
+
+def test_lookup(index):
+    assert index.lookup("alan_turing")[0] == "Alan Turing"
+    assert index.lookup("Turing")[0] == "Alan Turing"
+    assert index.lookup("Not an article") is None
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        index = build(directory)
+        for name, check in list(globals().items()):
+            if name.startswith('test_'):
+                check(index)
+                print(f"{name}: ok")
+        index.close()
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import os
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from AiMemory import AiMemoryManager
+from AiShardedMemory import ShardedMemoryManager
+from AiSnapshot import load_snapshot, save_snapshot
+
+# Checks ShardedMemoryManager against AiMemoryManager, run with:
+# python ShardedMemoryTest.py
+# Embeddings come from a stub client with fixed vectors, so no API key is needed.
+
+class StubClient:
+    # Same text -> same vector, every run
+    def embed(self, texts, model, input_type):
+        rng = np.random.default_rng(zlib.crc32(texts[0].encode('utf-8')))
+        return SimpleNamespace(embeddings=[rng.standard_normal(32).tolist()])
+
+def make(manager_class, **kwargs):
+    manager = manager_class("test", "Memory Manager", "Store and retrieve relevant context", **kwargs)
+    manager.llm = StubClient()
+    return manager
+
+TEXTS = [f"memory number {i}" for i in range(60)]
+QUERIES = ["memory number 7", "memory number 42", "something unrelated", "number"]
+
+async def same_results(plain, sharded):
+    for query in QUERIES:
+        for k in [1, 5, 100]:
+            expected = await plain.retrieve_relevant_context(query, k=k)
+            found = await sharded.retrieve_relevant_context(query, k=k)
+            assert found == expected, f"{query!r} k={k}: {found} != {expected}"
+
+async def test_matches_plain_search():
+    plain = make(AiMemoryManager)
+    # A tiny capacity makes every shard grow several times
+    sharded = make(ShardedMemoryManager, shards=3, capacity=4)
+    try:
+        assert await sharded.retrieve_relevant_context("anything") == []
+        for text in TEXTS:
+            await plain.store_memory(text)
+            await sharded.store_memory(text)
+        assert sorted(shard.count for shard in sharded._shards) == [20, 20, 20]
+        await same_results(plain, sharded)
+    finally:
+        sharded.close()
+
+async def test_snapshot_load_replaces_shards():
+    plain = make(AiMemoryManager)
+    for text in TEXTS[:25]:
+        await plain.store_memory(text)
+    file = io.BytesIO()
+    save_snapshot(plain, file)
+
+    sharded = make(ShardedMemoryManager, shards=2, capacity=4)
+    try:
+        for text in TEXTS[30:]:
+            await sharded.store_memory(text)
+        await sharded.retrieve_relevant_context("index the old memories")
+
+        # Loading swaps vector_memory out from under the shards
+        file.seek(0)
+        load_snapshot(sharded, file)
+        await same_results(plain, sharded)
+        assert sum(shard.count for shard in sharded._shards) == 25
+    finally:
+        sharded.close()
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            asyncio.run(check())
+            print(f"{name}: ok")
@@ -0,0 +1,108 @@
+import io
+import os
+import tempfile
+from types import SimpleNamespace
+
+from AiSnapshot import SnapshotError, load_snapshot, save_snapshot, save_snapshot_file
+
+# Round-trip checks for AiSnapshot, run with: python SnapshotTest.py
+# Uses stand-in memory objects so no API key is needed.
+
+def make_memory():
+    return SimpleNamespace(
+        role="Memory Manager",
+        goal="Store and retrieve relevant context",
+        vector_memory=[],
+        SummarizedMemory=[],
+        recent_interactions=[]
+    )
+
+def round_trip(memory, since=None, into=None):
+    file = io.BytesIO()
+    mark = save_snapshot(memory, file, since=since)
+    file.seek(0)
+    into = into or make_memory()
+    assert load_snapshot(into, file) == mark
+    return into, mark
+
+def test_empty_full_snapshot():
+    restored, _ = round_trip(make_memory())
+    assert restored.vector_memory == []
+    assert restored.SummarizedMemory == []
+
+def test_full_and_delta():
+    memory = make_memory()
+    for i in range(5):
+        memory.vector_memory.append({'text': f"memory {i}", 'vector': [float(i), 0.5, -1.0]})
+    memory.SummarizedMemory.append("Summary one")
+    memory.recent_interactions.append({'input': "hi", 'tools': "No tools used", 'response': "hello"})
+    restored, mark = round_trip(memory)
+    assert [m['text'] for m in restored.vector_memory] == [f"memory {i}" for i in range(5)]
+    assert list(restored.vector_memory[3]['vector']) == [3.0, 0.5, -1.0]
+
+    # Nothing added since the mark: an empty delta still applies cleanly
+    restored, mark = round_trip(memory, since=mark, into=restored)
+    assert len(restored.vector_memory) == 5
+
+    memory.vector_memory.append({'text': "memory 5", 'vector': [5.0, 0.5, -1.0]})
+    memory.SummarizedMemory.append("Summary two")
+    restored, _ = round_trip(memory, since=mark, into=restored)
+    assert len(restored.vector_memory) == 6
+    assert restored.SummarizedMemory == ["Summary one", "Summary two"]
+
+def test_empty_delta_of_empty_agent():
+    memory = make_memory()
+    restored, mark = round_trip(memory)
+    round_trip(memory, since=mark, into=restored)
+
+def test_corruption_is_rejected():
+    memory = make_memory()
+    memory.vector_memory.append({'text': "memory", 'vector': [1.0, 2.0]})
+    file = io.BytesIO()
+    save_snapshot(memory, file)
+    data = bytearray(file.getvalue())
+    data[-20] ^= 1
+    try:
+        load_snapshot(make_memory(), io.BytesIO(bytes(data)))
+    except SnapshotError:
+        return
+    raise AssertionError("Corrupted snapshot was loaded")
+
+def test_mixed_vector_sizes_are_rejected_before_writing():
+    memory = make_memory()
+    memory.vector_memory.append({'text': "a", 'vector': [1.0, 2.0]})
+    memory.vector_memory.append({'text': "b", 'vector': [1.0, 2.0, 3.0]})
+    file = io.BytesIO()
+    try:
+        save_snapshot(memory, file)
+    except SnapshotError:
+        assert file.getvalue() == b""
+        return
+    raise AssertionError("Mixed vector sizes were saved")
+
+def test_failed_save_keeps_previous_file():
+    memory = make_memory()
+    memory.vector_memory.append({'text': "original", 'vector': [1.0, 2.0]})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "agent.snap")
+        mark = save_snapshot_file(memory, path)
+        with open(path, 'rb') as file:
+            saved = file.read()
+
+        # Editing a stored memory invalidates the mark, so the delta must fail
+        memory.vector_memory[0]['text'] = "edited"
+        try:
+            save_snapshot_file(memory, path, since=mark)
+        except SnapshotError:
+            pass
+        else:
+            raise AssertionError("Delta against a changed memory was saved")
+        with open(path, 'rb') as file:
+            assert file.read() == saved
+        assert os.listdir(directory) == ["agent.snap"]
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_'):
+            check()
+            print(f"{name}: ok")